@@ -1,8 +1,12 @@
+import os
 import streamlit as st
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from core import Bond, bootstrap_yield_curve
+from core import (Bond, bootstrap_yield_curve, ResultsCache, run_batch_analysis, bond_from_row, cash_flow_ladder,
+                  instrument_key)
+
+RESULTS_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.bond_cache', 'results.sqlite')
 
 st.set_page_config(page_title="Bond Analytics Tool", layout="wide")
 
@@ -155,51 +159,50 @@ with tabs[2]:
             if not all(col in df.columns for col in required_cols):
                 st.error(f"Missing required columns. Please ensure your Excel has: {', '.join(required_cols)}")
             else:
+                use_cache = st.checkbox("Reuse results from previous runs", value=True,
+                                        help="Only rows whose terms or market inputs changed are recalculated.")
                 if st.button("Run Batch Analysis"):
-                    results = []
-                    for index, row in df.iterrows():
-                        try:
-                            # Handle optional columns with defaults
-                            redemption = row.get('Redemption', 100.0)
-                            
-                            bond = Bond(
-                                row['Settlement Date'],
-                                row['Maturity Date'],
-                                row['Coupon Rate'], # Assumed decimal or handle % later? Let's assume decimal as per app logic
-                                row['Face Value'],
-                                redemption,
-                                int(row['Frequency'])
-                            )
-                            
-                            res = row.to_dict()
-                            
-                            # Determine what to calculate
-                            if 'Market Price' in row and pd.notnull(row['Market Price']):
-                                price = row['Market Price']
-                                ytm = bond.yield_to_maturity(price)
-                                res['Calculated YTM'] = ytm
-                            elif 'YTM' in row and pd.notnull(row['YTM']):
-                                ytm = row['YTM']
-                                price = bond.price(ytm)
-                                res['Calculated Price'] = price
-                            else:
-                                ytm = np.nan
-                                price = np.nan
-                                
-                            if not np.isnan(ytm):
-                                res['Macaulay Duration'] = bond.macaulay_duration(ytm)
-                                res['Modified Duration'] = bond.modified_duration(ytm)
-                                res['Convexity'] = bond.convexity(ytm)
-                                
-                            results.append(res)
-                        except Exception as e:
-                            res = row.to_dict()
-                            res['Error'] = str(e)
-                            results.append(res)
-                    
-                    results_df = pd.DataFrame(results)
+                    cache = ResultsCache(RESULTS_CACHE_PATH) if use_cache else None
+                    results_df = run_batch_analysis(df, cache=cache)
+                    batch_stats = results_df.attrs['batch_stats']
+                    st.caption(f"{batch_stats['rows']} row(s) across {batch_stats['instruments']} distinct instrument(s); "
+                               f"{batch_stats['valuations']} distinct valuation(s), dedup ratio {batch_stats['dedup_ratio']:.1f}x.")
+                    if cache is not None:
+                        stats = cache.stats()
+                        st.caption(f"Recalculated {stats['misses']} valuation(s), reused {stats['hits']} from cache.")
+                        cache.close()
                     st.subheader("Results")
                     st.dataframe(results_df)
+
+                    # Projected cash flows of the whole book, one schedule per distinct instrument
+                    lots = {}
+                    for _, row in df.iterrows():
+                        ikey = instrument_key(row)
+                        if ikey in lots:
+                            lots[ikey][1] += 1
+                            continue
+                        try:
+                            lots[ikey] = [bond_from_row(row), 1]
+                        except Exception:
+                            lots[ikey] = [None, 0]
+                    lots = [lot for lot in lots.values() if lot[0] is not None]
+
+                    ladder_df = cash_flow_ladder([bond for bond, _ in lots], freq='M',
+                                                 quantities=[count for _, count in lots])
+                    if not ladder_df.empty:
+                        st.subheader("📅 Projected Cash-Flow Ladder")
+                        fig_ladder = go.Figure()
+                        fig_ladder.add_trace(go.Bar(x=ladder_df['Bucket'], y=ladder_df['Coupon'], name='Coupon'))
+                        fig_ladder.add_trace(go.Bar(x=ladder_df['Bucket'], y=ladder_df['Redemption'], name='Redemption'))
+                        fig_ladder.update_layout(
+                            barmode='stack',
+                            title="Projected Cash Flows by Month",
+                            xaxis_title="Month",
+                            yaxis_title="Cash Flow",
+                            hovermode="x unified",
+                            height=400
+                        )
+                        st.plotly_chart(fig_ladder, use_container_width=True)
                     
                     # Sort by Maturity Date for better visualization
                     if 'Maturity Date' in results_df.columns:
@@ -1,8 +1,21 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
 import numpy as np
 import pandas as pd
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from scipy.optimize import newton
 from datetime import date
 
+try:
+    import numba
+except ImportError:  # Numba is optional; the NumPy kernels are used instead
+    numba = None
+
 class Bond:
     def __init__(self, settlement_date, maturity_date, coupon_rate, face_value=100, redemption=100, frequency=2):
         """
@@ -219,3 +232,1000 @@ def bootstrap_yield_curve(maturities, prices, coupon_rates, face_value=100, freq
 
     data['ZeroRate'] = zero_rates
     return data
+
+
+
+def _interp_weights(x, xp):
+    """
+    Matrix W such that W @ fp == np.interp(x, xp, fp) for any fp.
+
+    np.interp is linear in fp, so interpolating the unit vectors gives the weights.
+    """
+    return np.column_stack([np.interp(x, xp, unit) for unit in np.eye(len(xp))])
+
+
+def _bootstrap_panel_block(maturities, prices, coupon_rates, face_value, frequency):
+    """
+    Bootstrap zero rates for a block of dates at once.
+
+    :param maturities: Sorted maturities in years, shape (instruments,)
+    :param prices: Prices, shape (dates, instruments)
+    :param coupon_rates: Coupon rates, shape (dates, instruments)
+    :return: Zero rates, shape (dates, instruments)
+    """
+    zero_rates = np.full(prices.shape, np.nan)
+    for i, T in enumerate(maturities):
+        P = prices[:, i]
+        coupon_payment = (face_value * coupon_rates[:, i]) / frequency
+        periods = int(T * frequency)
+
+        if periods == 1:
+            zero_rates[:, i] = ((face_value + coupon_payment) / P - 1) * frequency
+            continue
+
+        pv_coupons = np.zeros(len(P))
+        if i > 0:
+            # Same interpolation as bootstrap_yield_curve, shared by every date
+            steps = np.arange(1, periods)
+            weights = _interp_weights(steps / frequency, maturities[:i])
+            known = zero_rates[:, :i]
+            z = np.nan_to_num(known) @ weights.T
+            # np.interp only propagates NaN from the knots it actually uses
+            z[(np.isnan(known).astype(np.float64) @ (weights != 0).T) > 0] = np.nan
+            pv_coupons = np.sum(coupon_payment[:, None] / (1 + z / frequency) ** steps, axis=1)
+
+        remaining_val = P - pv_coupons
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = (((face_value + coupon_payment) / remaining_val) ** (1 / periods) - 1) * frequency
+        zero_rates[:, i] = np.where(remaining_val > 0, r, np.nan)
+    return zero_rates
+
+
+def bootstrap_yield_curves(maturities, prices, coupon_rates, face_value=100, frequency=2, dates=None, workers=None):
+    """
+    Bootstrap zero-coupon yield curves for a panel of quotes in one call.
+
+    Equivalent to calling `bootstrap_yield_curve` once per date, but each
+    bootstrapping step is vectorised across all dates.
+
+    :param maturities: Maturities in years, one per instrument
+    :param prices: Prices with shape (dates, instruments); a DataFrame's index is used as the dates
+    :param coupon_rates: Coupon rates (decimal), one per instrument or shape (dates, instruments)
+    :param face_value: Face value
+    :param frequency: Payment frequency
+    :param dates: Optional labels for the rows of `prices`
+    :param workers: Number of worker processes; dates are split into blocks when greater than 1
+    :return: DataFrame of zero rates indexed by date with one column per sorted maturity
+    """
+    if dates is None and isinstance(prices, pd.DataFrame):
+        dates = prices.index
+    prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+    maturities = np.asarray(maturities, dtype=np.float64)
+    coupon_rates = np.broadcast_to(np.asarray(coupon_rates, dtype=np.float64), prices.shape)
+    if prices.shape[1] != len(maturities):
+        raise ValueError("prices must have one column per maturity.")
+
+    # Sort by maturity
+    order = np.argsort(maturities, kind='stable')
+    maturities = maturities[order]
+    prices = prices[:, order]
+    coupon_rates = coupon_rates[:, order]
+
+    if workers is not None and workers > 1 and len(prices) > 1:
+        blocks = np.array_split(np.arange(len(prices)), min(workers, len(prices)))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_bootstrap_panel_block, maturities, prices[idx], coupon_rates[idx],
+                                       face_value, frequency) for idx in blocks]
+            zero_rates = np.vstack([f.result() for f in futures])
+    else:
+        zero_rates = _bootstrap_panel_block(maturities, prices, coupon_rates, face_value, frequency)
+
+    return pd.DataFrame(zero_rates, index=dates, columns=maturities)
+
+
+class TaylorRepricer:
+    """
+    Fast-path repricing of bonds for small yield moves.
+
+    At each full valuation the bond's price, modified duration and convexity are
+    cached. Subsequent prices are approximated with the second-order expansion
+        P(y0 + dy) ~ P0 * (1 - D_mod * dy + 0.5 * C * dy^2)
+    and the bond is repriced exactly (and the cache re-anchored) whenever the
+    yield move exceeds `max_shift` or the estimated truncation error is too large.
+    """
+
+    def __init__(self, max_shift=0.0025, max_rel_error=1e-6):
+        """
+        :param max_shift: Largest absolute yield move (decimal) served by the fast path
+        :param max_rel_error: Largest estimated error, relative to the cached price, served by the fast path
+        """
+        self.max_shift = max_shift
+        self.max_rel_error = max_rel_error
+        self._bonds = {}
+        self._snapshots = {}
+        self.seeded_count = 0    # explicit revalue() calls
+        self.fast_count = 0      # price() calls served by the expansion
+        self.fallback_count = 0  # price() calls that repriced exactly
+
+    def revalue(self, key, bond, yield_to_maturity):
+        """
+        Fully value a bond and cache its price, modified duration and convexity.
+
+        :param key: Identifier used for later calls to `price`
+        :param bond: Bond object
+        :param yield_to_maturity: Annual yield to maturity (decimal)
+        :return: Bond price
+        """
+        self.seeded_count += 1
+        return self._snapshot(key, bond, yield_to_maturity)
+
+    def _snapshot(self, key, bond, yield_to_maturity):
+        self._bonds[key] = bond
+        price = bond.price(yield_to_maturity)
+        ytm_period = yield_to_maturity / bond.frequency
+        t = bond.time_periods
+        f = bond.frequency
+        # Third derivative of price with respect to yield, used for the error bound:
+        # d3P/dy3 = -sum( t * (t + 1/f) * (t + 2/f) * CF / (1+y/f)^(t*f + 3) )
+        third = np.sum(t * (t + 1/f) * (t + 2/f) * bond.cash_flows / (1 + ytm_period) ** (t * f + 3))
+        self._snapshots[key] = {
+            'ytm': yield_to_maturity,
+            'price': price,
+            'modified_duration': bond.modified_duration(yield_to_maturity),
+            'convexity': bond.convexity(yield_to_maturity),
+            'third_derivative': third,
+        }
+        return price
+
+    def error_bound(self, key, yield_to_maturity):
+        """
+        Estimate the absolute error of the second-order approximation.
+
+        Uses the leading truncated term of the Taylor series, |P'''| * |dy|^3 / 6.
+        """
+        snap = self._snapshots[key]
+        dy = yield_to_maturity - snap['ytm']
+        return abs(snap['third_derivative']) * abs(dy) ** 3 / 6
+
+    def price(self, key, yield_to_maturity):
+        """
+        Price a previously valued bond at a new yield.
+
+        :param key: Identifier passed to `revalue`
+        :param yield_to_maturity: Annual yield to maturity (decimal)
+        :return: Bond price (approximate on the fast path, exact otherwise)
+        """
+        snap = self._snapshots[key]
+        dy = yield_to_maturity - snap['ytm']
+        if abs(dy) <= self.max_shift and self.error_bound(key, yield_to_maturity) <= self.max_rel_error * abs(snap['price']):
+            self.fast_count += 1
+            return snap['price'] * (1 - snap['modified_duration'] * dy + 0.5 * snap['convexity'] * dy ** 2)
+        self.fallback_count += 1
+        return self._snapshot(key, self._bonds[key], yield_to_maturity)
+
+    def stats(self):
+        """
+        Return counters for how often each pricing path was taken.
+
+        `fast_ratio` is the share of `price` calls served by the fast path;
+        explicit `revalue` calls are reported separately as `seeded`.
+        """
+        total = self.fast_count + self.fallback_count
+        return {
+            'seeded': self.seeded_count,
+            'fast': self.fast_count,
+            'fallback': self.fallback_count,
+            'fast_ratio': self.fast_count / total if total else 0.0,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Batch kernels over flat ragged cash-flow arrays
+# ---------------------------------------------------------------------------
+
+# Cash flows of many bonds laid end to end. Bond i owns the slice
+# offsets[i]:offsets[i + 1] of `times` and `flows`.
+FlatSchedules = namedtuple('FlatSchedules', ['times', 'flows', 'offsets', 'frequencies'])
+
+KERNEL_BACKENDS = ('numpy', 'numba')
+_kernel_backend = 'numba' if numba is not None else 'numpy'
+
+
+def set_kernel_backend(backend):
+    """
+    Select the backend used by the batch kernels.
+
+    :param backend: 'numpy' or 'numba' (requires Numba to be installed)
+    """
+    if backend not in KERNEL_BACKENDS:
+        raise ValueError(f"Unknown kernel backend '{backend}'. Choose from {KERNEL_BACKENDS}.")
+    if backend == 'numba' and numba is None:
+        raise ValueError("The 'numba' backend requires Numba to be installed.")
+    global _kernel_backend
+    _kernel_backend = backend
+
+
+def get_kernel_backend():
+    """
+    Return the name of the active kernel backend.
+    """
+    return _kernel_backend
+
+
+def flatten_schedules(bonds, dtype=np.float64):
+    """
+    Concatenate the cash-flow schedules of several bonds into flat arrays.
+
+    Passing dtype=np.float32 stores cash-flow times and amounts in single
+    precision, halving the memory the schedules occupy. The Numba kernels read
+    them directly, so scenario runs also move half the data; the NumPy backend
+    builds float64 temporaries as it computes. Sums are always accumulated in
+    float64.
+
+    :param bonds: Iterable of Bond objects
+    :param dtype: Storage dtype for times and flows (np.float64 or np.float32)
+    :return: FlatSchedules
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float64, np.float32):
+        raise ValueError("dtype must be float64 or float32.")
+    bonds = list(bonds)
+    counts = np.array([b.num_cash_flows for b in bonds], dtype=np.int64)
+    offsets = np.zeros(len(bonds) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    if bonds:
+        times = np.concatenate([b.time_periods for b in bonds]).astype(dtype)
+        flows = np.concatenate([b.cash_flows for b in bonds]).astype(dtype)
+    else:
+        times = np.empty(0, dtype=dtype)
+        flows = np.empty(0, dtype=dtype)
+    frequencies = np.array([b.frequency for b in bonds], dtype=np.float64)
+    return FlatSchedules(times, flows, offsets, frequencies)
+
+
+# NumPy backend: per-bond parameters are broadcast onto the flat arrays and
+# per-bond sums are taken with a segmented reduction.
+
+def _segment_sum(values, offsets):
+    counts = np.diff(offsets)
+    out = np.zeros(len(counts))
+    nonempty = counts > 0
+    if nonempty.any():
+        out[nonempty] = np.add.reduceat(values, offsets[:-1][nonempty])
+    return out
+
+
+def _numpy_exponents(times, offsets, frequencies):
+    # Per-flow frequency and compounding exponent t * f; independent of the yields
+    f = np.repeat(frequencies, np.diff(offsets))
+    return f, times * f
+
+
+def _numpy_discount(flows, offsets, f, exponent, yields):
+    base = 1 + np.repeat(yields, np.diff(offsets)) / f
+    # f and base are float64, so float32 times/flows are promoted before summing
+    return base, flows / base ** exponent
+
+
+def _numpy_terms(times, flows, offsets, frequencies, yields):
+    f, exponent = _numpy_exponents(times, offsets, frequencies)
+    base, pv = _numpy_discount(flows, offsets, f, exponent, yields)
+    return f, base, pv
+
+
+def _numpy_price(times, flows, offsets, frequencies, yields):
+    _, _, pv = _numpy_terms(times, flows, offsets, frequencies, yields)
+    return _segment_sum(pv, offsets)
+
+
+def _numpy_risk(times, flows, offsets, frequencies, yields):
+    f, base, pv = _numpy_terms(times, flows, offsets, frequencies, yields)
+    price = _segment_sum(pv, offsets)
+    macaulay = _segment_sum(times * pv, offsets) / price
+    modified = macaulay / (1 + yields / frequencies)
+    convexity = _segment_sum(times * (times + 1 / f) * pv / base ** 2, offsets) / price
+    return price, macaulay, modified, convexity
+
+
+def _numpy_ytm(times, flows, offsets, frequencies, prices, guesses, tol, maxiter):
+    ytm = guesses.astype(np.float64).copy()
+    active = np.ones(len(ytm), dtype=bool)
+    converged = np.zeros(len(ytm), dtype=bool)
+    counts = np.diff(offsets)
+    for _ in range(maxiter):
+        f, base, pv = _numpy_terms(times, flows, offsets, frequencies, ytm)
+        value = _segment_sum(pv, offsets) - prices
+        # dP/dy = -sum( t * CF / (1+y/f)^(t*f + 1) )
+        slope = -_segment_sum(times * pv / base, offsets)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.where(active, value / slope, 0.0)
+        # A flat or non-finite slope, or a non-finite step, means the iteration has
+        # diverged; drop the bond without marking it converged (as the loop kernel does)
+        failed = active & ((slope == 0) | ~np.isfinite(slope) | ~np.isfinite(step))
+        active &= ~failed
+        step[~active] = 0.0
+        ytm -= step
+        done = active & (np.abs(step) < tol)
+        converged |= done
+        active &= ~done & (counts > 0) & np.isfinite(ytm)
+        if not active.any():
+            break
+    return np.where(converged, ytm, np.nan)
+
+
+# Loop backend: the same maths as explicit loops, compiled with Numba when available.
+
+def _loop_price(times, flows, offsets, frequencies, yields):
+    n = len(offsets) - 1
+    out = np.zeros(n)
+    for i in range(n):
+        f = frequencies[i]
+        base = 1 + yields[i] / f
+        total = 0.0
+        for k in range(offsets[i], offsets[i + 1]):
+            total += flows[k] / base ** (times[k] * f)
+        out[i] = total
+    return out
+
+
+def _loop_risk(times, flows, offsets, frequencies, yields):
+    n = len(offsets) - 1
+    price = np.zeros(n)
+    macaulay = np.zeros(n)
+    modified = np.zeros(n)
+    convexity = np.zeros(n)
+    for i in range(n):
+        f = frequencies[i]
+        base = 1 + yields[i] / f
+        p = 0.0
+        tp = 0.0
+        cp = 0.0
+        for k in range(offsets[i], offsets[i + 1]):
+            t = times[k]
+            pv = flows[k] / base ** (t * f)
+            p += pv
+            tp += t * pv
+            cp += t * (t + 1 / f) * pv / base ** 2
+        price[i] = p
+        macaulay[i] = tp / p
+        modified[i] = macaulay[i] / base
+        convexity[i] = cp / p
+    return price, macaulay, modified, convexity
+
+
+def _loop_ytm(times, flows, offsets, frequencies, prices, guesses, tol, maxiter):
+    n = len(offsets) - 1
+    out = np.full(n, np.nan)
+    for i in range(n):
+        f = frequencies[i]
+        y = guesses[i]
+        for _ in range(maxiter):
+            base = 1 + y / f
+            value = 0.0
+            slope = 0.0
+            for k in range(offsets[i], offsets[i + 1]):
+                pv = flows[k] / base ** (times[k] * f)
+                value += pv
+                slope -= times[k] * pv / base
+            value -= prices[i]
+            if slope == 0.0 or not np.isfinite(slope):
+                break
+            step = value / slope
+            y -= step
+            if not np.isfinite(y):
+                break
+            if abs(step) < tol:
+                out[i] = y
+                break
+    return out
+
+
+if numba is not None:
+    _numba_price = numba.njit(cache=True)(_loop_price)
+    _numba_risk = numba.njit(cache=True)(_loop_risk)
+    _numba_ytm = numba.njit(cache=True)(_loop_ytm)
+    _KERNELS = {
+        'numpy': (_numpy_price, _numpy_risk, _numpy_ytm),
+        'numba': (_numba_price, _numba_risk, _numba_ytm),
+    }
+else:
+    _KERNELS = {
+        'numpy': (_numpy_price, _numpy_risk, _numpy_ytm),
+    }
+
+
+def _kernels(backend):
+    backend = backend or _kernel_backend
+    if backend not in _KERNELS:
+        raise ValueError(f"Kernel backend '{backend}' is not available.")
+    return _KERNELS[backend]
+
+
+def _per_bond(values, n):
+    return np.broadcast_to(np.asarray(values, dtype=np.float64), (n,)).copy()
+
+
+def batch_price(schedules, yields, backend=None):
+    """
+    Price many bonds at once.
+
+    :param schedules: FlatSchedules from `flatten_schedules`
+    :param yields: Annual yields to maturity, one per bond (or a scalar)
+    :param backend: Kernel backend; defaults to the active backend
+    :return: Array of prices
+    """
+    n = len(schedules.offsets) - 1
+    return _kernels(backend)[0](schedules.times, schedules.flows, schedules.offsets,
+                                schedules.frequencies, _per_bond(yields, n))
+
+
+def batch_risk(schedules, yields, backend=None):
+    """
+    Compute price, Macaulay duration, modified duration and convexity for many bonds.
+
+    :param schedules: FlatSchedules from `flatten_schedules`
+    :param yields: Annual yields to maturity, one per bond (or a scalar)
+    :param backend: Kernel backend; defaults to the active backend
+    :return: Dict of arrays keyed by metric name
+    """
+    n = len(schedules.offsets) - 1
+    price, macaulay, modified, convexity = _kernels(backend)[1](
+        schedules.times, schedules.flows, schedules.offsets, schedules.frequencies, _per_bond(yields, n))
+    return {
+        'price': price,
+        'macaulay_duration': macaulay,
+        'modified_duration': modified,
+        'convexity': convexity,
+    }
+
+
+def batch_yield_to_maturity(schedules, prices, guesses=0.05, tol=1e-12, maxiter=50, backend=None):
+    """
+    Solve yields to maturity for many bonds with a vectorised Newton iteration.
+
+    :param schedules: FlatSchedules from `flatten_schedules`
+    :param prices: Target prices, one per bond (or a scalar)
+    :param guesses: Initial yield guesses, one per bond (or a scalar)
+    :param tol: Convergence tolerance on the Newton step
+    :param maxiter: Maximum number of Newton iterations
+    :param backend: Kernel backend; defaults to the active backend
+    :return: Array of yields (NaN where the iteration did not converge)
+    """
+    n = len(schedules.offsets) - 1
+    return _kernels(backend)[2](schedules.times, schedules.flows, schedules.offsets, schedules.frequencies,
+                                _per_bond(prices, n), _per_bond(guesses, n), tol, maxiter)
+
+
+def batch_price_scenarios(schedules, yield_scenarios, backend=None):
+    """
+    Price many bonds under many yield scenarios (Monte Carlo paths or grid sweeps).
+
+    :param schedules: FlatSchedules from `flatten_schedules` (float32 storage is supported)
+    :param yield_scenarios: Array of shape (scenarios, bonds), or (scenarios,) for a common yield
+    :param backend: Kernel backend; defaults to the active backend
+    :return: Array of prices with shape (scenarios, bonds)
+    """
+    scenarios = np.asarray(yield_scenarios, dtype=np.float64)
+    n = len(schedules.offsets) - 1
+    if scenarios.ndim == 1:
+        scenarios = np.repeat(scenarios[:, None], n, axis=1)
+    price = _kernels(backend)[0]
+    out = np.empty((scenarios.shape[0], n))
+    if (backend or _kernel_backend) == 'numpy':
+        # Repeated frequencies and exponents do not depend on the scenario; build them once
+        f, exponent = _numpy_exponents(schedules.times, schedules.offsets, schedules.frequencies)
+        for s in range(scenarios.shape[0]):
+            _, pv = _numpy_discount(schedules.flows, schedules.offsets, f, exponent, scenarios[s])
+            out[s] = _segment_sum(pv, schedules.offsets)
+        return out
+    for s in range(scenarios.shape[0]):
+        out[s] = price(schedules.times, schedules.flows, schedules.offsets,
+                       schedules.frequencies, np.ascontiguousarray(scenarios[s]))
+    return out
+
+
+def precision_report(bonds, yields, backend=None):
+    """
+    Compare single-precision storage against the float64 path.
+
+    :param bonds: List of Bond objects
+    :param yields: Annual yields to maturity, one per bond
+    :param backend: Kernel backend; defaults to the active backend
+    :return: DataFrame of float64 values and absolute/relative errors per bond and metric
+    """
+    full = batch_risk(flatten_schedules(bonds), yields, backend=backend)
+    single = batch_risk(flatten_schedules(bonds, dtype=np.float32), yields, backend=backend)
+    frames = []
+    for metric in full:
+        abs_error = np.abs(single[metric] - full[metric])
+        frames.append(pd.DataFrame({
+            'Bond': np.arange(len(bonds)),
+            'Metric': metric,
+            'Float64': full[metric],
+            'Float32': single[metric],
+            'AbsError': abs_error,
+            'RelError': abs_error / np.abs(full[metric]),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+# ---------------------------------------------------------------------------
+# Batch analysis of uploaded workbooks
+# ---------------------------------------------------------------------------
+
+# Columns that determine a row's results; a change to any of them forces recomputation
+BATCH_KEY_COLUMNS = ['Settlement Date', 'Maturity Date', 'Coupon Rate', 'Face Value',
+                     'Redemption', 'Frequency', 'Market Price', 'YTM']
+BATCH_RESULT_COLUMNS = ['Calculated YTM', 'Calculated Price', 'Macaulay Duration',
+                        'Modified Duration', 'Convexity', 'Error']
+# Bump when the valuation logic changes so stale cached results are not reused
+RESULTS_CACHE_VERSION = 1
+
+
+def bond_from_row(row):
+    """
+    Build a Bond from the instrument columns of a batch row.
+    """
+    # Handle optional columns with defaults
+    redemption = row.get('Redemption', 100.0)
+
+    return Bond(
+        row['Settlement Date'],
+        row['Maturity Date'],
+        row['Coupon Rate'],
+        row['Face Value'],
+        redemption,
+        int(row['Frequency'])
+    )
+
+
+def analyze_bond_row(row, bond=None):
+    """
+    Value one row of a batch workbook.
+
+    :param row: pandas Series (or dict) with the batch columns
+    :param bond: Optional prebuilt Bond for the row's instrument terms
+    :return: Dict of calculated fields (subset of BATCH_RESULT_COLUMNS)
+    """
+    res = {}
+    try:
+        if bond is None:
+            bond = bond_from_row(row)
+
+        # Determine what to calculate
+        if 'Market Price' in row and pd.notnull(row['Market Price']):
+            ytm = bond.yield_to_maturity(row['Market Price'])
+            res['Calculated YTM'] = ytm
+        elif 'YTM' in row and pd.notnull(row['YTM']):
+            ytm = row['YTM']
+            res['Calculated Price'] = bond.price(ytm)
+        else:
+            ytm = np.nan
+
+        if not np.isnan(ytm):
+            res['Macaulay Duration'] = bond.macaulay_duration(ytm)
+            res['Modified Duration'] = bond.modified_duration(ytm)
+            res['Convexity'] = bond.convexity(ytm)
+    except Exception as e:
+        res['Error'] = str(e)
+    return res
+
+
+def _key_value(value):
+    if value is None or (not isinstance(value, str) and pd.isnull(value)):
+        return None
+    if isinstance(value, (date, pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    return str(value)
+
+
+def _row_terms(row):
+    terms = {col: _key_value(row.get(col)) for col in BATCH_KEY_COLUMNS}
+    if terms['Redemption'] is None and 'Redemption' not in row:
+        terms['Redemption'] = 100.0
+    return terms
+
+
+def instrument_key(row):
+    """
+    Identify the instrument and settlement date of a batch row.
+
+    Rows sharing this key have identical cash-flow schedules.
+
+    :param row: pandas Series (or dict) with the batch columns
+    :return: Hashable tuple
+    """
+    terms = _row_terms(row)
+    return tuple(terms[col] for col in BATCH_KEY_COLUMNS if col not in ('Market Price', 'YTM'))
+
+
+def row_key(row):
+    """
+    Hash the terms of a batch row that determine its results.
+
+    :param row: pandas Series (or dict) with the batch columns
+    :return: Hex digest string
+    """
+    payload = json.dumps([RESULTS_CACHE_VERSION, _row_terms(row)], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultsCache:
+    """
+    On-disk cache of batch results keyed by `row_key`, stored in SQLite.
+
+    Entries are evicted when older than `max_age` seconds or, beyond
+    `max_entries`, in least-recently-used order.
+    """
+
+    def __init__(self, path, max_age=7 * 24 * 3600, max_entries=100000):
+        """
+        :param path: SQLite file path (parent directories are created)
+        :param max_age: Maximum entry age in seconds (None to disable)
+        :param max_entries: Maximum number of entries kept (None to disable)
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.evict()
+
+    def get_many(self, keys):
+        """
+        Look up cached results.
+
+        :param keys: Iterable of row keys
+        :return: Dict mapping found keys to result dicts
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for key, result in self._conn.execute(
+                    f"SELECT key, result FROM results WHERE key IN ({placeholders})", chunk):
+                found[key] = json.loads(result)
+            self._conn.execute(f"UPDATE results SET last_used = ? WHERE key IN ({placeholders})", [now] + chunk)
+        self._conn.commit()
+        return found
+
+    def put_many(self, items):
+        """
+        Store results.
+
+        :param items: Dict mapping row keys to result dicts
+        """
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO results (key, result, created, last_used) VALUES (?, ?, ?, ?)",
+            [(key, json.dumps(result), now, now) for key, result in items.items()]
+        )
+        self._conn.commit()
+
+    def evict(self):
+        """
+        Remove entries beyond the age and size limits.
+
+        :return: Number of entries removed
+        """
+        removed = 0
+        if self.max_age is not None:
+            removed += self._conn.execute(
+                "DELETE FROM results WHERE created < ?", (time.time() - self.max_age,)).rowcount
+        if self.max_entries is not None:
+            removed += self._conn.execute(
+                "DELETE FROM results WHERE key NOT IN "
+                "(SELECT key FROM results ORDER BY last_used DESC LIMIT ?)", (self.max_entries,)).rowcount
+        self._conn.commit()
+        return removed
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        self._conn.execute("DELETE FROM results")
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def stats(self):
+        """
+        Return hit/miss counters for this cache instance.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self)}
+
+
+def run_batch_analysis(df, cache=None):
+    """
+    Value every row of a batch workbook.
+
+    Rows are grouped so that each distinct instrument schedule is built once and
+    each distinct (instrument, market input) pair is solved once; results are
+    then scattered back to every row. With a ResultsCache, only pairs whose
+    terms changed since a previous run are recomputed; results for the others
+    are merged from the cache.
+
+    Grouping and cache statistics are stored in `result.attrs['batch_stats']`.
+
+    :param df: DataFrame with the batch columns
+    :param cache: Optional ResultsCache
+    :return: DataFrame of the input columns plus calculated fields
+    """
+    rows = [row for _, row in df.iterrows()]
+    keys = [row_key(row) for row in rows]
+
+    # First row seen for each distinct (instrument, market input) pair
+    representatives = {}
+    for i, key in enumerate(keys):
+        representatives.setdefault(key, i)
+
+    computed = cache.get_many(representatives) if cache is not None else {}
+    pending = [key for key in representatives if key not in computed]
+
+    bonds = {}
+    fresh = {}
+    for key in pending:
+        row = rows[representatives[key]]
+        ikey = instrument_key(row)
+        if ikey not in bonds:
+            try:
+                bonds[ikey] = bond_from_row(row)
+            except Exception:
+                # analyze_bond_row rebuilds the bond and records the error
+                bonds[ikey] = None
+        fresh[key] = analyze_bond_row(row, bonds[ikey])
+    computed.update(fresh)
+
+    if cache is not None:
+        cache.hits += len(representatives) - len(pending)
+        cache.misses += len(pending)
+        cache.put_many(fresh)
+        cache.evict()
+
+    results = []
+    for row, key in zip(rows, keys):
+        merged = row.to_dict()
+        res = computed[key]
+        merged.update({col: res[col] for col in BATCH_RESULT_COLUMNS if col in res})
+        results.append(merged)
+    results_df = pd.DataFrame(results)
+    results_df.attrs['batch_stats'] = {
+        'rows': len(rows),
+        'instruments': len({instrument_key(rows[i]) for i in representatives.values()}),
+        'valuations': len(representatives),
+        'schedules_built': sum(bond is not None for bond in bonds.values()),
+        'solved': len(pending),
+        'dedup_ratio': len(rows) / len(representatives) if representatives else 1.0,
+    }
+    return results_df
+
+
+# ---------------------------------------------------------------------------
+# Portfolio cash-flow ladder
+# ---------------------------------------------------------------------------
+
+LADDER_FREQUENCIES = {'M': 1, 'Q': 3, 'Y': 12}
+
+
+class CashFlowLadder:
+    """
+    Aggregate projected coupon and redemption flows into calendar buckets.
+
+    Bonds can be added in chunks so books larger than memory can be streamed
+    through. Each chunk is flattened and reduced with a single `np.bincount`
+    per flow type, then added into running totals indexed by bucket.
+    """
+
+    def __init__(self, freq='M'):
+        """
+        :param freq: Bucket size, 'M' (month), 'Q' (quarter) or 'Y' (year)
+        """
+        if freq not in LADDER_FREQUENCIES:
+            raise ValueError(f"Unknown ladder frequency '{freq}'. Choose from {tuple(LADDER_FREQUENCIES)}.")
+        self.freq = freq
+        self._months_per_bucket = LADDER_FREQUENCIES[freq]
+        self._start = None  # Bucket number of the first slot in the running totals
+        self._coupons = np.zeros(0)
+        self._redemptions = np.zeros(0)
+        self.num_bonds = 0
+
+    def add(self, bonds, quantities=None):
+        """
+        Add the projected flows of a chunk of bonds.
+
+        :param bonds: Iterable of Bond objects
+        :param quantities: Optional position sizes (multiples of each bond's flows)
+        """
+        bonds = list(bonds)
+        if not bonds:
+            return
+        counts = np.array([b.num_cash_flows for b in bonds])
+        months = np.concatenate([
+            pd.DatetimeIndex(b.cash_flow_dates).values.astype('datetime64[M]').astype(np.int64) for b in bonds
+        ])
+        buckets = months // self._months_per_bucket
+
+        scale = np.ones(len(bonds)) if quantities is None else np.asarray(quantities, dtype=np.float64)
+        coupons = np.repeat([b.face_value * b.coupon_rate / b.frequency for b in bonds] * scale, counts)
+        redemptions = np.zeros(len(buckets))
+        redemptions[np.cumsum(counts) - 1] = [b.redemption for b in bonds] * scale
+
+        lo = buckets.min()
+        coupon_sums = np.bincount(buckets - lo, weights=coupons)
+        redemption_sums = np.bincount(buckets - lo, weights=redemptions, minlength=len(coupon_sums))
+        self._accumulate(lo, coupon_sums, redemption_sums)
+        self.num_bonds += len(bonds)
+
+    def _accumulate(self, lo, coupon_sums, redemption_sums):
+        hi = lo + len(coupon_sums)
+        if self._start is None:
+            self._start = lo
+        start = min(self._start, lo)
+        end = max(self._start + len(self._coupons), hi)
+        if start != self._start or end != self._start + len(self._coupons):
+            grown_coupons = np.zeros(end - start)
+            grown_redemptions = np.zeros(end - start)
+            shift = self._start - start
+            grown_coupons[shift:shift + len(self._coupons)] = self._coupons
+            grown_redemptions[shift:shift + len(self._redemptions)] = self._redemptions
+            self._coupons, self._redemptions, self._start = grown_coupons, grown_redemptions, start
+        self._coupons[lo - start:hi - start] += coupon_sums
+        self._redemptions[lo - start:hi - start] += redemption_sums
+
+    def to_frame(self, include_empty=True):
+        """
+        Return the ladder as a DataFrame.
+
+        :param include_empty: Keep buckets with no flows between the first and last flow
+        :return: DataFrame with Bucket (start date), Coupon, Redemption and Total columns
+        """
+        if self._start is None:
+            return pd.DataFrame({'Bucket': pd.to_datetime([]), 'Coupon': [], 'Redemption': [], 'Total': []})
+        months = (self._start + np.arange(len(self._coupons))) * self._months_per_bucket
+        ladder = pd.DataFrame({
+            'Bucket': pd.to_datetime(months.astype('datetime64[M]')),
+            'Coupon': self._coupons,
+            'Redemption': self._redemptions,
+            'Total': self._coupons + self._redemptions,
+        })
+        if not include_empty:
+            ladder = ladder[ladder['Total'] != 0].reset_index(drop=True)
+        return ladder
+
+
+def cash_flow_ladder(bonds, freq='M', quantities=None, chunk_size=10000):
+    """
+    Aggregate the projected flows of a book into calendar buckets.
+
+    `bonds` may be any iterable (including a generator), consumed `chunk_size`
+    bonds at a time.
+
+    :param bonds: Iterable of Bond objects
+    :param freq: Bucket size, 'M' (month), 'Q' (quarter) or 'Y' (year)
+    :param quantities: Optional iterable of position sizes, aligned with `bonds`
+    :param chunk_size: Number of bonds flattened per reduction
+    :return: DataFrame with Bucket, Coupon, Redemption and Total columns
+    """
+    ladder = CashFlowLadder(freq)
+    bonds = iter(bonds)
+    quantities = iter(quantities) if quantities is not None else None
+    while True:
+        chunk = list(islice(bonds, chunk_size))
+        if not chunk:
+            break
+        scale = list(islice(quantities, len(chunk))) if quantities is not None else None
+        ladder.add(chunk, scale)
+    return ladder.to_frame()
+
+
+# ---------------------------------------------------------------------------
+# Horizon and roll-down analytics
+# ---------------------------------------------------------------------------
+
+def _curve_arrays(curve):
+    if isinstance(curve, tuple):
+        return curve
+    curve = curve.dropna(subset=['ZeroRate']).sort_values('Maturity')
+    return curve['Maturity'].to_numpy(dtype=np.float64), curve['ZeroRate'].to_numpy(dtype=np.float64)
+
+
+def _curve_discount(t, curve_maturities, curve_rates, curve_frequency):
+    z = np.interp(t, curve_maturities, curve_rates)
+    return 1 / (1 + z / curve_frequency) ** (t * curve_frequency)
+
+
+def curve_price(schedules, curve, curve_frequency=2):
+    """
+    Price many bonds off a zero-coupon curve.
+
+    :param schedules: FlatSchedules from `flatten_schedules`
+    :param curve: DataFrame with 'Maturity' (years) and 'ZeroRate' columns, e.g. from bootstrap_yield_curve,
+        or a (maturities, zero_rates) tuple of sorted arrays without NaNs
+    :param curve_frequency: Compounding frequency of the zero rates
+    :return: Array of prices
+    """
+    discount = _curve_discount(schedules.times, *_curve_arrays(curve), curve_frequency)
+    return _segment_sum(schedules.flows * discount, schedules.offsets)
+
+
+def horizon_analytics(bonds, curve, horizons=(1, 3, 12), curve_frequency=2):
+    """
+    Carry, roll-down and total return of a book over several horizons.
+
+    Each bond's schedule is reused rather than rebuilding a Bond per horizon:
+    coupons paid before the horizon date are counted as income, and the
+    remaining flows are discounted off the unchanged (rolled-down) zero curve
+    with their times shifted by the horizon. A redemption paid before the
+    horizon is part of the horizon value (HorizonPrice), not income. All bonds
+    and horizons are priced in one vectorised pass over the flattened schedules.
+
+    Carry is coupon income over the horizon divided by today's price, RollDown
+    is the change in value from ageing along the unchanged curve (including
+    any principal repaid) divided by today's price, and TotalReturn is their sum.
+
+    :param bonds: List of Bond objects
+    :param curve: DataFrame with 'Maturity' (years) and 'ZeroRate' columns, e.g. from bootstrap_yield_curve
+    :param horizons: Horizons in months
+    :param curve_frequency: Compounding frequency of the zero rates
+    :return: DataFrame with one row per bond and horizon
+    """
+    bonds = list(bonds)
+    schedules = flatten_schedules(bonds)
+    curve_maturities, curve_rates = _curve_arrays(curve)
+
+    def discount(t):
+        return _curve_discount(t, curve_maturities, curve_rates, curve_frequency)
+
+    counts = np.diff(schedules.offsets)
+    starts = schedules.offsets[:-1]
+    times = schedules.times
+    flows = schedules.flows
+    price = curve_price(schedules, curve, curve_frequency)
+
+    # Horizon length in years per (horizon, bond), on the same Act/365 basis as time_periods
+    settlement = pd.DatetimeIndex([b.settlement_date for b in bonds])
+    horizon_dates = np.array([(settlement + pd.DateOffset(months=m)).values for m in horizons])
+    horizon_years = (horizon_dates - settlement.values[None, :]) / np.timedelta64(1, 'D') / 365.0
+
+    # Shift every flow by its bond's horizon: shape (horizons, flows)
+    shifted = times[None, :] - np.repeat(horizon_years, counts, axis=1)
+    alive = shifted > 0
+    # Split each bond's final flow into its coupon and redemption parts
+    redemptions = np.zeros(len(flows))
+    redemptions[schedules.offsets[1:] - 1] = [b.redemption for b in bonds]
+    coupon_flows = flows - redemptions
+    coupons = np.add.reduceat(np.where(alive, 0.0, coupon_flows), starts, axis=1)
+    redeemed = np.add.reduceat(np.where(alive, 0.0, redemptions), starts, axis=1)
+    horizon_price = redeemed + np.add.reduceat(
+        np.where(alive, flows * discount(np.maximum(shifted, 0.0)), 0.0), starts, axis=1)
+
+    carry = coupons / price
+    roll_down = (horizon_price - price) / price
+    return pd.DataFrame({
+        'Bond': np.tile(np.arange(len(bonds)), len(horizons)),
+        'Horizon': np.repeat([f"{m}M" for m in horizons], len(bonds)),
+        'HorizonDate': pd.to_datetime(horizon_dates.ravel()),
+        'Price': np.tile(price, len(horizons)),
+        'HorizonPrice': horizon_price.ravel(),
+        'Coupons': coupons.ravel(),
+        'Carry': carry.ravel(),
+        'RollDown': roll_down.ravel(),
+        'TotalReturn': (carry + roll_down).ravel(),
+    })
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import numpy as np
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import core
+from core import Bond, flatten_schedules, batch_price, batch_risk, batch_yield_to_maturity
+
+# Benchmark the batch kernels against per-bond Bond method calls.
+# Usage: python scripts/benchmark_kernels.py [number_of_bonds]
+
+
+def make_book(n, seed=0):
+    rng = np.random.default_rng(seed)
+    settlement = date(2024, 1, 1)
+    bonds = []
+    for _ in range(n):
+        maturity = settlement + timedelta(days=int(rng.integers(180, 365 * 30)))
+        coupon = round(float(rng.uniform(0.0, 0.08)), 4)
+        frequency = int(rng.choice([1, 2, 4]))
+        bonds.append(Bond(settlement, maturity, coupon, 100, 100, frequency))
+    yields = rng.uniform(0.01, 0.07, n)
+    return bonds, yields
+
+
+def timed(fn, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(n=2000):
+    bonds, yields = make_book(n)
+    schedules = flatten_schedules(bonds)
+    prices = np.array([b.price(y) for b, y in zip(bonds, yields)])
+
+    def loop_risk():
+        return [(b.price(y), b.macaulay_duration(y), b.modified_duration(y), b.convexity(y))
+                for b, y in zip(bonds, yields)]
+
+    def loop_ytm():
+        return [b.yield_to_maturity(p) for b, p in zip(bonds, prices)]
+
+    rows = [
+        ('price', 'Bond loop', timed(lambda: [b.price(y) for b, y in zip(bonds, yields)])[0]),
+        ('risk', 'Bond loop', timed(loop_risk)[0]),
+        ('ytm', 'Bond loop', timed(loop_ytm, repeat=1)[0]),
+    ]
+    for backend in core._KERNELS:
+        # Warm up so Numba compilation time is not counted
+        batch_yield_to_maturity(schedules, prices, backend=backend)
+        batch_risk(schedules, yields, backend=backend)
+        rows.append(('price', backend, timed(lambda: batch_price(schedules, yields, backend=backend))[0]))
+        rows.append(('risk', backend, timed(lambda: batch_risk(schedules, yields, backend=backend))[0]))
+        rows.append(('ytm', backend, timed(lambda: batch_yield_to_maturity(schedules, prices, backend=backend))[0]))
+
+    baseline = {op: t for op, name, t in rows if name == 'Bond loop'}
+    print(f"{n} bonds, {len(schedules.times)} cash flows")
+    print(f"{'Operation':<10}{'Backend':<12}{'Time (ms)':>12}{'Speedup':>10}")
+    for op, name, t in rows:
+        print(f"{op:<10}{name:<12}{t * 1000:>12.2f}{baseline[op] / t:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,118 @@
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from service import make_server
+
+# Load test for the local pricing service.
+# Starts the service in-process on localhost unless --url points at a running one.
+# Usage: python scripts/load_test_service.py [--requests 5000] [--concurrency 32]
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def get(url):
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+
+def make_requests(n, instruments=500, seed=0):
+    # Requests are drawn from a fixed universe so warm schedules get reused
+    rng = np.random.default_rng(seed)
+    universe = []
+    for _ in range(instruments):
+        years = int(rng.integers(1, 30))
+        universe.append({
+            'settlement_date': '2024-01-01',
+            'maturity_date': f"{2024 + years}-01-01",
+            'coupon_rate': round(float(rng.uniform(0.0, 0.08)), 3),
+            'frequency': int(rng.choice([1, 2, 4])),
+        })
+    requests = []
+    for i in range(n):
+        request = dict(universe[rng.integers(instruments)])
+        mode = i % 3
+        if mode == 0:
+            request['ytm'] = float(rng.uniform(0.01, 0.07))
+        elif mode == 1:
+            request['price'] = float(rng.uniform(85, 115))
+        else:
+            request['curve'] = 'benchmark'
+        requests.append(request)
+    return requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the local pricing service")
+    parser.add_argument('--url', help="Base URL of a running service (default: start one in-process)")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--instruments', type=int, default=500, help="Size of the instrument universe")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = make_server('127.0.0.1', 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    post(f"{url}/curves/benchmark", {
+        'maturities': [0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 7.0, 10.0],
+        'prices': [98.0, 100.5, 100.0, 101.0, 102.0, 103.5, 104.0, 105.0],
+        'coupon_rates': [0.0, 0.035, 0.035, 0.04, 0.045, 0.05, 0.052, 0.055],
+    })
+
+    requests = make_requests(args.requests, args.instruments)
+    latencies = []
+    address = urllib.parse.urlparse(url)
+    local = threading.local()
+
+    def call(payload):
+        # One persistent (keep-alive) connection per client thread
+        if not hasattr(local, 'conn'):
+            local.conn = http.client.HTTPConnection(address.hostname, address.port)
+        start = time.perf_counter()
+        local.conn.request('POST', '/price', body=json.dumps(payload),
+                           headers={'Content-Type': 'application/json'})
+        result = json.loads(local.conn.getresponse().read())
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(call, requests))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    errors = sum('error' in r for r in results)
+    print(f"{len(requests)} requests, concurrency {args.concurrency}, {errors} error(s)")
+    print(f"Client throughput: {len(requests) / elapsed:.0f} req/s")
+    print(f"Client latency ms: p50 {np.percentile(latencies, 50):.2f}  "
+          f"p95 {np.percentile(latencies, 95):.2f}  p99 {np.percentile(latencies, 99):.2f}")
+    print("Server metrics:")
+    for key, value in get(f"{url}/metrics").items():
+        print(f"  {key}: {value}")
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
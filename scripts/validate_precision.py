@@ -0,0 +1,63 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from core import Bond, flatten_schedules, batch_price_scenarios, precision_report
+
+# Quantify the pricing error of float32 schedule storage against the float64 path
+# for every example workbook. Usage: python scripts/validate_precision.py
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', 'examples')
+WORKBOOKS = ['bond_analysis_template.xlsx', 'corporate_bonds_example.xlsx', 'term_structure_example.xlsx']
+
+
+def load_workbook(path):
+    df = pd.read_excel(path)
+    bonds = []
+    yields = []
+    for _, row in df.iterrows():
+        bond = Bond(row['Settlement Date'], row['Maturity Date'], row['Coupon Rate'],
+                    row['Face Value'], row.get('Redemption', 100.0), int(row['Frequency']))
+        if 'Market Price' in row and pd.notnull(row['Market Price']):
+            ytm = bond.yield_to_maturity(row['Market Price'])
+        elif 'YTM' in row and pd.notnull(row['YTM']):
+            ytm = row['YTM']
+        else:
+            continue
+        bonds.append(bond)
+        yields.append(ytm)
+    return bonds, np.array(yields)
+
+
+def main():
+    summaries = []
+    for name in WORKBOOKS:
+        bonds, yields = load_workbook(os.path.join(EXAMPLES_DIR, name))
+        report = precision_report(bonds, yields)
+        summary = report.groupby('Metric')[['AbsError', 'RelError']].max()
+        summary.insert(0, 'Workbook', name)
+        summaries.append(summary.reset_index())
+
+        # Scenario sweep: parallel shifts of +/- 300bp
+        shifts = np.linspace(-0.03, 0.03, 61)
+        scenarios = yields[None, :] + shifts[:, None]
+        full = batch_price_scenarios(flatten_schedules(bonds), scenarios)
+        single = batch_price_scenarios(flatten_schedules(bonds, dtype=np.float32), scenarios)
+        rel = np.abs(single - full) / np.abs(full)
+        summaries.append(pd.DataFrame({
+            'Metric': ['price (scenario sweep)'],
+            'Workbook': [name],
+            'AbsError': [np.abs(single - full).max()],
+            'RelError': [rel.max()],
+        }))
+
+    result = pd.concat(summaries, ignore_index=True)[['Workbook', 'Metric', 'AbsError', 'RelError']]
+    pd.set_option('display.width', 120)
+    print("Maximum float32 vs float64 error")
+    print(result.to_string(index=False, float_format=lambda x: f"{x:.3e}"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,431 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from core import (Bond, bootstrap_yield_curve, flatten_schedules, batch_risk, batch_yield_to_maturity,
+                  curve_price)
+
+# Local pricing service.
+#
+# Usage: python service.py [--host 127.0.0.1] [--port 8765]
+#
+#   POST /price          one request object or a list of them:
+#                        {"settlement_date", "maturity_date", "coupon_rate", "face_value",
+#                         "redemption", "frequency"} plus one of "ytm", "price" or "curve"
+#   POST /curves/<name>  {"maturities", "prices", "coupon_rates", "face_value", "frequency"}
+#   GET  /metrics        latency, throughput and batching statistics
+#   GET  /health
+
+INSTRUMENT_FIELDS = ['settlement_date', 'maturity_date', 'coupon_rate', 'face_value', 'redemption', 'frequency']
+# Longest time an HTTP handler waits for its batch to be valued
+REQUEST_TIMEOUT = 30.0
+
+
+def _parse_frequency(value):
+    # Bond steps back 12 / frequency whole months, so only divisors of 12 are valid
+    try:
+        frequency = float(value)
+    except (TypeError, ValueError):
+        frequency = None
+    if frequency is None or not frequency.is_integer() or frequency <= 0 or 12 % int(frequency):
+        raise ValueError(f"Invalid frequency {value!r}. Must be one of 1, 2, 3, 4, 6 or 12.")
+    return int(frequency)
+
+
+class PricingEngine:
+    """
+    Keeps bond schedules and zero curves warm in memory and values requests in batches.
+    """
+
+    def __init__(self, max_schedules=10000):
+        """
+        :param max_schedules: Number of Bond schedules kept (least recently used are dropped)
+        """
+        self.max_schedules = max_schedules
+        self._schedules = OrderedDict()
+        self._curves = {}
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        """
+        Run a small batch so kernel compilation (Numba) happens before the first request.
+        """
+        self.value_many([
+            {'settlement_date': '2024-01-01', 'maturity_date': '2029-01-01', 'coupon_rate': 0.05, 'ytm': 0.05},
+            {'settlement_date': '2024-01-01', 'maturity_date': '2029-01-01', 'coupon_rate': 0.05, 'price': 100.0},
+        ])
+
+    def set_curve(self, name, maturities, prices, coupon_rates, face_value=100, frequency=2):
+        """
+        Bootstrap and store a zero curve under `name`.
+
+        :return: DataFrame from bootstrap_yield_curve
+        :raises ValueError: If no quote bootstraps to a finite zero rate
+        """
+        curve = bootstrap_yield_curve(maturities, prices, coupon_rates, face_value, frequency)
+        valid = curve.dropna(subset=['ZeroRate'])
+        if valid.empty:
+            raise ValueError(f"Curve '{name}' has no valid zero rates.")
+        arrays = (valid['Maturity'].to_numpy(dtype=np.float64), valid['ZeroRate'].to_numpy(dtype=np.float64))
+        with self._lock:
+            self._curves[name] = (arrays, frequency)
+        return curve
+
+    def _bond(self, request):
+        frequency = _parse_frequency(request.get('frequency', 2))
+        key = tuple(str(request.get(field)) for field in INSTRUMENT_FIELDS)
+        with self._lock:
+            bond = self._schedules.get(key)
+            if bond is not None:
+                self._schedules.move_to_end(key)
+                return bond
+        bond = Bond(request['settlement_date'], request['maturity_date'], request['coupon_rate'],
+                    request.get('face_value', 100), request.get('redemption', 100), frequency)
+        with self._lock:
+            self._schedules[key] = bond
+            while len(self._schedules) > self.max_schedules:
+                self._schedules.popitem(last=False)
+        return bond
+
+    def value_many(self, requests):
+        """
+        Value a batch of requests with one vectorised call per pricing mode.
+
+        :param requests: List of request dicts
+        :return: List of result dicts, aligned with `requests`
+        """
+        results = [None] * len(requests)
+        bonds = {}
+        prices = {}
+        yields = {}
+        by_curve = {}
+        for i, request in enumerate(requests):
+            try:
+                bond = self._bond(request)
+                # Requests quoted off a stored curve are turned into price requests below
+                if 'curve' in request:
+                    by_curve.setdefault(request['curve'], []).append(i)
+                elif 'price' in request:
+                    prices[i] = float(request['price'])
+                elif 'ytm' in request:
+                    yields[i] = float(request['ytm'])
+                else:
+                    raise ValueError("Request needs one of 'ytm', 'price' or 'curve'.")
+                bonds[i] = bond
+            except Exception as e:
+                results[i] = {'error': str(e)}
+
+        for name, idx in by_curve.items():
+            with self._lock:
+                stored = self._curves.get(name)
+            if stored is None:
+                for i in idx:
+                    results[i] = {'error': f"Unknown curve '{name}'."}
+                continue
+            curve, frequency = stored
+            # A failure here must not take down the other requests in the batch
+            try:
+                values = curve_price(flatten_schedules(bonds[i] for i in idx), curve, frequency)
+            except Exception as e:
+                for i in idx:
+                    results[i] = {'error': f"Could not price off curve '{name}': {e}"}
+                continue
+            prices.update(zip(idx, values))
+
+        if prices:
+            idx = list(prices)
+            guesses = [bonds[i].coupon_rate if bonds[i].coupon_rate > 0 else 0.05 for i in idx]
+            solved = batch_yield_to_maturity(flatten_schedules(bonds[i] for i in idx),
+                                             np.array([prices[i] for i in idx]), guesses)
+            yields.update(zip(idx, solved))
+
+        valid = [i for i in yields if np.isfinite(yields[i])]
+        for i in yields:
+            if not np.isfinite(yields[i]):
+                results[i] = {'error': 'Could not calculate YTM. Price might be invalid.'}
+        if valid:
+            risk = batch_risk(flatten_schedules(bonds[i] for i in valid), np.array([yields[i] for i in valid]))
+            for k, i in enumerate(valid):
+                values = [prices.get(i, risk['price'][k])] + [risk[m][k] for m in
+                                                                ('macaulay_duration', 'modified_duration', 'convexity')]
+                if not np.all(np.isfinite(values)):
+                    # e.g. ytm <= -frequency makes the discount base non-positive
+                    results[i] = {'error': f"Yield {yields[i]!r} gives a non-finite price or risk."}
+                    continue
+                results[i] = {
+                    'price': float(prices.get(i, risk['price'][k])),
+                    'ytm': float(yields[i]),
+                    'macaulay_duration': float(risk['macaulay_duration'][k]),
+                    'modified_duration': float(risk['modified_duration'][k]),
+                    'convexity': float(risk['convexity'][k]),
+                }
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {'schedules': len(self._schedules), 'curves': sorted(self._curves)}
+
+
+class ServiceMetrics:
+    """
+    Thread-safe latency, throughput and batching counters.
+    """
+
+    def __init__(self, window=10000, rate_window=10.0):
+        """
+        :param window: Number of most recent requests kept for percentiles and rates
+        :param rate_window: Seconds over which throughput is measured
+        """
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._completed = deque(maxlen=window)
+        self._batch_sizes = deque(maxlen=window)
+        self.rate_window = rate_window
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+
+    def record_batch(self, size):
+        with self._lock:
+            self.batches += 1
+            self._batch_sizes.append(size)
+
+    def record_request(self, latency, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self._latencies.append(latency)
+            self._completed.append(time.time())
+
+    def snapshot(self):
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            batch_sizes = np.array(self._batch_sizes)
+            now = time.time()
+            uptime = now - self.started
+            # Rate over the recent window, so idle periods do not dilute it forever
+            cutoff = now - self.rate_window
+            recent = sum(1 for t in self._completed if t >= cutoff)
+            span = min(self.rate_window, uptime)
+            if len(self._completed) == self._completed.maxlen and self._completed[0] > cutoff:
+                # Window holds more requests than we keep; measure over what we have
+                span = now - self._completed[0]
+            snap = {
+                'uptime_s': uptime,
+                'requests': self.requests,
+                'errors': self.errors,
+                'batches': self.batches,
+                'throughput_rps': recent / span if span > 0 else 0.0,
+                'throughput_window_s': self.rate_window,
+                'mean_batch_size': float(batch_sizes.mean()) if len(batch_sizes) else 0.0,
+                'max_batch_size': int(batch_sizes.max()) if len(batch_sizes) else 0,
+            }
+            for p in (50, 95, 99):
+                snap[f'latency_p{p}_ms'] = float(np.percentile(latencies, p)) if len(latencies) else 0.0
+            return snap
+
+
+# Queue sentinel that tells the MicroBatcher worker to exit
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests and values them together.
+
+    A worker thread waits for the first request, then keeps collecting until
+    `max_batch` requests are queued or `max_wait` seconds have passed.
+    """
+
+    def __init__(self, engine, metrics, max_batch=256, max_wait=0.002):
+        self.engine = engine
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, request):
+        """
+        Queue one request.
+
+        :return: concurrent.futures.Future resolving to the result dict
+        """
+        future = Future()
+        self._queue.put((request, future, time.perf_counter()))
+        return future
+
+    def close(self, timeout=5.0):
+        """
+        Stop the worker thread after it finishes the requests already queued.
+        """
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                results = self.engine.value_many([request for request, _, _ in batch])
+            except Exception as e:
+                results = [{'error': str(e)}] * len(batch)
+            self.metrics.record_batch(len(batch))
+            now = time.perf_counter()
+            for (_, future, queued), result in zip(batch, results):
+                self.metrics.record_request(now - queued, 'error' in result)
+                future.set_result(result)
+
+
+class PricingHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under concurrent load
+    request_queue_size = 1024
+    # Set by make_server
+    batcher = None
+
+    def server_close(self):
+        super().server_close()
+        if self.batcher is not None:
+            self.batcher.close()
+
+
+class PricingRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive lets clients reuse one connection for many requests; headers and
+    # body are written separately, so Nagle's algorithm would delay every response
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    # Set by make_server
+    engine = None
+    batcher = None
+    metrics = None
+
+    def _send(self, status, payload):
+        try:
+            # Bare NaN/Infinity tokens are not valid JSON for other systems
+            body = json.dumps(payload, allow_nan=False).encode('utf-8')
+        except ValueError as e:
+            status = 500
+            body = json.dumps({'error': f"Result is not valid JSON: {e}"}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send(200, {**self.metrics.snapshot(), **self.engine.stats()})
+        elif self.path == '/health':
+            self._send(200, {'status': 'ok'})
+        else:
+            self._send(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+        except ValueError as e:
+            self._send(400, {'error': f"Invalid JSON: {e}"})
+            return
+
+        if self.path == '/price':
+            if not isinstance(payload, (list, dict)):
+                self._send(400, {'error': 'Expected a request object or a list of them.'})
+                return
+            items = payload if isinstance(payload, list) else [payload]
+            futures = [self.batcher.submit(item) for item in items]
+            deadline = time.perf_counter() + REQUEST_TIMEOUT
+            try:
+                results = [f.result(timeout=max(deadline - time.perf_counter(), 0)) for f in futures]
+            except FutureTimeoutError:
+                self._send(504, {'error': 'Timed out waiting for the pricing engine.'})
+                return
+            self._send(200, results if isinstance(payload, list) else results[0])
+        elif self.path.startswith('/curves/'):
+            name = self.path[len('/curves/'):]
+            try:
+                curve = self.engine.set_curve(name, payload['maturities'], payload['prices'],
+                                              payload['coupon_rates'], payload.get('face_value', 100),
+                                              payload.get('frequency', 2))
+            except Exception as e:
+                self._send(400, {'error': str(e)})
+                return
+            self._send(200, {'name': name, 'maturities': curve['Maturity'].tolist(),
+                             'zero_rates': curve['ZeroRate'].where(curve['ZeroRate'].notna(), None).tolist()})
+        else:
+            self._send(404, {'error': 'Not found'})
+
+    def log_message(self, format, *args):
+        # Per-request logging would dominate latency; use /metrics instead
+        pass
+
+
+def make_server(host='127.0.0.1', port=8765, max_batch=256, max_wait=0.002, engine=None):
+    """
+    Build (but do not start) the pricing HTTP server.
+
+    :return: PricingHTTPServer; call serve_forever() to run it and server_close() to stop the batcher
+    """
+    engine = engine or PricingEngine()
+    engine.warm_up()
+    metrics = ServiceMetrics()
+    batcher = MicroBatcher(engine, metrics, max_batch, max_wait)
+    handler = type('BoundPricingRequestHandler', (PricingRequestHandler,), {
+        'engine': engine,
+        'metrics': metrics,
+        'batcher': batcher,
+    })
+    server = PricingHTTPServer((host, port), handler)
+    server.batcher = batcher
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local bond pricing service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=256, help="Largest micro-batch")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help="Longest wait to fill a micro-batch")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.max_batch, args.max_wait_ms / 1000)
+    print(f"Pricing service listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
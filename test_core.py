@@ -1,8 +1,14 @@
+import os
+import tempfile
 import unittest
 import numpy as np
 import pandas as pd
 from datetime import date, timedelta
-from core import Bond
+import core
+from core import (Bond, bootstrap_yield_curve, bootstrap_yield_curves, TaylorRepricer, flatten_schedules, batch_price, batch_risk,
+                  batch_yield_to_maturity, batch_price_scenarios, precision_report,
+                  ResultsCache, row_key, instrument_key, run_batch_analysis, CashFlowLadder,
+                  cash_flow_ladder, horizon_analytics)
 
 class TestBond(unittest.TestCase):
     def setUp(self):
@@ -42,5 +48,325 @@ class TestBond(unittest.TestCase):
         price_check = bond.price(ytm)
         self.assertAlmostEqual(price_check, target_price, places=4)
 
+class TestTaylorRepricer(unittest.TestCase):
+    def setUp(self):
+        self.bond = Bond(date(2023, 1, 1), date(2033, 1, 1), 0.05, 100, 100, 2)
+        self.repricer = TaylorRepricer(max_shift=0.0025, max_rel_error=1e-5)
+        self.repricer.revalue('10y', self.bond, 0.05)
+
+    def test_small_move_uses_fast_path(self):
+        price = self.repricer.price('10y', 0.0505)
+        self.assertAlmostEqual(price, self.bond.price(0.0505), places=4)
+        self.assertEqual(self.repricer.stats(), {'seeded': 1, 'fast': 1, 'fallback': 0, 'fast_ratio': 1.0})
+
+    def test_large_move_falls_back(self):
+        price = self.repricer.price('10y', 0.06)
+        self.assertAlmostEqual(price, self.bond.price(0.06), places=10)
+        self.assertEqual(self.repricer.stats(), {'seeded': 1, 'fast': 0, 'fallback': 1, 'fast_ratio': 0.0})
+        # The fallback re-anchors the cache, so a small move from the new yield is fast again
+        self.repricer.price('10y', 0.0601)
+        self.assertEqual(self.repricer.stats()['fast_ratio'], 0.5)
+
+    def test_error_bound_triggers_fallback(self):
+        strict = TaylorRepricer(max_shift=0.01, max_rel_error=1e-12)
+        strict.revalue('10y', self.bond, 0.05)
+        strict.price('10y', 0.052)
+        self.assertEqual(strict.stats()['fast'], 0)
+        self.assertEqual(strict.stats()['fallback'], 1)
+
+class TestBatchKernels(unittest.TestCase):
+    def setUp(self):
+        settlement = date(2023, 1, 1)
+        self.bonds = [
+            Bond(settlement, date(2028, 1, 1), 0.05, 100, 100, 1),
+            Bond(settlement, date(2026, 7, 1), 0.08, 100, 100, 2),
+            Bond(settlement, date(2030, 1, 1), 0.02, 100, 100, 4),
+            Bond(settlement, date(2033, 1, 1), 0.00, 100, 100, 1),
+            Bond(settlement, date(2025, 3, 15), 0.05, 1000, 1050, 12),
+        ]
+        self.schedules = flatten_schedules(self.bonds)
+        self.yields = np.array([0.05, 0.045, 0.03, 0.052, 0.061])
+
+    def test_numpy_matches_bond_methods(self):
+        risk = batch_risk(self.schedules, self.yields, backend='numpy')
+        for i, (bond, y) in enumerate(zip(self.bonds, self.yields)):
+            self.assertAlmostEqual(risk['price'][i], bond.price(y), places=10)
+            self.assertAlmostEqual(risk['macaulay_duration'][i], bond.macaulay_duration(y), places=10)
+            self.assertAlmostEqual(risk['modified_duration'][i], bond.modified_duration(y), places=10)
+            self.assertAlmostEqual(risk['convexity'][i], bond.convexity(y), places=10)
+        np.testing.assert_allclose(batch_price(self.schedules, self.yields, backend='numpy'), risk['price'])
+
+    def test_ytm_round_trip(self):
+        prices = batch_price(self.schedules, self.yields, backend='numpy')
+        ytm = batch_yield_to_maturity(self.schedules, prices, backend='numpy')
+        np.testing.assert_allclose(ytm, self.yields, rtol=0, atol=1e-10)
+        self.assertAlmostEqual(ytm[1], self.bonds[1].yield_to_maturity(prices[1]), places=8)
+
+    def test_loop_kernels_match_numpy(self):
+        args = (self.schedules.times, self.schedules.flows, self.schedules.offsets, self.schedules.frequencies)
+        np.testing.assert_allclose(core._loop_price(*args, self.yields),
+                                   core._numpy_price(*args, self.yields), rtol=1e-13)
+        for loop, vec in zip(core._loop_risk(*args, self.yields), core._numpy_risk(*args, self.yields)):
+            np.testing.assert_allclose(loop, vec, rtol=1e-13)
+        prices = core._numpy_price(*args, self.yields)
+        guesses = np.full(len(self.bonds), 0.05)
+        np.testing.assert_allclose(core._loop_ytm(*args, prices, guesses, 1e-12, 50),
+                                   core._numpy_ytm(*args, prices, guesses, 1e-12, 50), rtol=0, atol=1e-12)
+
+    def test_unreachable_prices_return_nan(self):
+        settlement = date(2023, 1, 1)
+        bonds = [
+            Bond(settlement, date(2033, 1, 1), 0.05, 100, 100, 2),
+            Bond(settlement, date(2033, 1, 1), 0.05, 100, 100, 2),
+            Bond(settlement, date(2028, 1, 1), 0.00, 100, 100, 1),
+        ]
+        prices = np.array([-5.0, 0.0, 500.0])
+        schedules = flatten_schedules(bonds)
+        with np.errstate(all='ignore'):
+            expected = [bond.yield_to_maturity(p) for bond, p in zip(bonds, prices)]
+            self.assertTrue(np.isnan(expected).all())
+            for backend in core._KERNELS:
+                ytm = batch_yield_to_maturity(schedules, prices, backend=backend)
+                np.testing.assert_array_equal(ytm, expected)
+            args = (schedules.times, schedules.flows, schedules.offsets, schedules.frequencies)
+            np.testing.assert_array_equal(core._loop_ytm(*args, prices, np.full(3, 0.05), 1e-12, 50), expected)
+
+    @unittest.skipIf(core.numba is None, "Numba not installed")
+    def test_numba_matches_numpy(self):
+        for key in ('price', 'macaulay_duration', 'modified_duration', 'convexity'):
+            np.testing.assert_allclose(batch_risk(self.schedules, self.yields, backend='numba')[key],
+                                       batch_risk(self.schedules, self.yields, backend='numpy')[key], rtol=1e-13)
+        prices = batch_price(self.schedules, self.yields)
+        np.testing.assert_allclose(batch_yield_to_maturity(self.schedules, prices, backend='numba'),
+                                   batch_yield_to_maturity(self.schedules, prices, backend='numpy'), rtol=0, atol=1e-12)
+
+    def test_float32_storage(self):
+        single = flatten_schedules(self.bonds, dtype=np.float32)
+        self.assertEqual(single.times.dtype, np.float32)
+        self.assertEqual(single.flows.dtype, np.float32)
+        for backend in core._KERNELS:
+            prices = batch_price(single, self.yields, backend=backend)
+            self.assertEqual(prices.dtype, np.float64)
+            np.testing.assert_allclose(prices, batch_price(self.schedules, self.yields), rtol=1e-6)
+
+    def test_scenarios(self):
+        scenarios = self.yields[None, :] + np.array([-0.01, 0.0, 0.01])[:, None]
+        prices = batch_price_scenarios(self.schedules, scenarios)
+        self.assertEqual(prices.shape, (3, len(self.bonds)))
+        np.testing.assert_allclose(prices[1], batch_price(self.schedules, self.yields))
+        for backend in core._KERNELS:
+            single = batch_price_scenarios(flatten_schedules(self.bonds, dtype=np.float32), scenarios, backend=backend)
+            np.testing.assert_allclose(single, prices, rtol=1e-6)
+            np.testing.assert_allclose(batch_price_scenarios(self.schedules, scenarios, backend=backend),
+                                       prices, rtol=1e-13)
+        flat = batch_price_scenarios(self.schedules, np.array([0.04, 0.05]))
+        self.assertAlmostEqual(flat[1, 0], self.bonds[0].price(0.05), places=10)
+
+    def test_precision_report(self):
+        report = precision_report(self.bonds, self.yields)
+        self.assertEqual(len(report), 4 * len(self.bonds))
+        self.assertLess(report['RelError'].max(), 1e-6)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            core.set_kernel_backend('fortran')
+
+def make_batch_book():
+    # Small batch workbook shared by the batch analysis tests
+    return pd.DataFrame({
+        'Description': ['A', 'B', 'C'],
+        'Settlement Date': pd.to_datetime(['2023-01-01'] * 3),
+        'Maturity Date': pd.to_datetime(['2028-01-01', '2026-01-01', '2030-01-01']),
+        'Coupon Rate': [0.05, 0.08, 0.02],
+        'Face Value': [100, 100, 100],
+        'Redemption': [100, 100, 100],
+        'Frequency': [1, 2, 4],
+        'Market Price': [100.0, 105.0, np.nan],
+        'YTM': [np.nan, np.nan, 0.045],
+    })
+
+class TestResultsCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'results.sqlite')
+        self.df = make_batch_book()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_incremental_run_matches_full_run(self):
+        expected = run_batch_analysis(self.df)
+        cache = ResultsCache(self.path)
+        run_batch_analysis(self.df, cache=cache)
+        self.assertEqual(cache.stats()['misses'], 3)
+        cache.close()
+
+        changed = self.df.copy()
+        changed.loc[1, 'Market Price'] = 104.0
+        changed.loc[0, 'Description'] = 'Renamed'
+        cache = ResultsCache(self.path)
+        result = run_batch_analysis(changed, cache=cache)
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['misses'], 1)
+        cache.close()
+
+        self.assertEqual(result.loc[0, 'Description'], 'Renamed')
+        self.assertAlmostEqual(result.loc[0, 'Calculated YTM'], expected.loc[0, 'Calculated YTM'], places=12)
+        self.assertAlmostEqual(result.loc[2, 'Calculated Price'], expected.loc[2, 'Calculated Price'], places=12)
+        self.assertGreater(result.loc[1, 'Calculated YTM'], expected.loc[1, 'Calculated YTM'])
+
+    def test_row_key_ignores_non_terms(self):
+        row = self.df.iloc[0]
+        renamed = row.copy()
+        renamed['Description'] = 'Other'
+        self.assertEqual(row_key(row), row_key(renamed))
+        repriced = row.copy()
+        repriced['Market Price'] = 99.0
+        self.assertNotEqual(row_key(row), row_key(repriced))
+
+    def test_eviction(self):
+        cache = ResultsCache(self.path, max_age=None, max_entries=2)
+        run_batch_analysis(self.df, cache=cache)
+        self.assertEqual(len(cache), 2)
+        cache.max_age = -1
+        cache.evict()
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+class TestBatchGrouping(unittest.TestCase):
+    def setUp(self):
+        self.df = make_batch_book()
+
+    def test_duplicate_lots_are_grouped(self):
+        book = pd.concat([self.df] * 4, ignore_index=True)
+        book.loc[3, 'Market Price'] = 99.0
+        result = run_batch_analysis(book)
+        stats = result.attrs['batch_stats']
+        self.assertEqual(stats['rows'], 12)
+        self.assertEqual(stats['instruments'], 3)
+        self.assertEqual(stats['schedules_built'], 3)
+        self.assertEqual(stats['valuations'], 4)
+        self.assertAlmostEqual(stats['dedup_ratio'], 3.0)
+        self.assertEqual(instrument_key(book.iloc[0]), instrument_key(book.iloc[3]))
+        single = run_batch_analysis(self.df)
+        for i in (0, 6, 9):
+            self.assertEqual(result.loc[i, 'Calculated YTM'], single.loc[0, 'Calculated YTM'])
+        self.assertGreater(result.loc[3, 'Calculated YTM'], single.loc[0, 'Calculated YTM'])
+
+    def test_invalid_instrument_rows_report_errors(self):
+        # Settlement after maturity: the shared schedule cannot be built for any lot
+        bad = self.df.iloc[[0]].assign(**{'Maturity Date': pd.Timestamp('2022-01-01')})
+        book = pd.concat([self.df, bad, bad.assign(**{'Market Price': 98.0}), bad], ignore_index=True)
+        result = run_batch_analysis(book)
+        for i in (3, 4, 5):
+            self.assertIn('Settlement date must be before maturity date', result.loc[i, 'Error'])
+            self.assertTrue(pd.isnull(result.loc[i, 'Calculated YTM']))
+        self.assertTrue(result.loc[:2, 'Error'].isnull().all())
+        stats = result.attrs['batch_stats']
+        self.assertEqual(stats['valuations'], 5)
+        self.assertEqual(stats['schedules_built'], 3)
+
+class TestCashFlowLadder(unittest.TestCase):
+    def setUp(self):
+        settlement = date(2023, 1, 1)
+        self.bonds = [
+            Bond(settlement, date(2025, 1, 1), 0.05, 100, 100, 2),
+            Bond(settlement, date(2024, 3, 15), 0.04, 1000, 1000, 4),
+            Bond(settlement, date(2030, 6, 30), 0.03, 100, 105, 12),
+        ]
+
+    def test_totals_match_schedules(self):
+        ladder = cash_flow_ladder(self.bonds, quantities=[2, 1, 3])
+        expected = sum(q * b.cash_flows.sum() for q, b in zip([2, 1, 3], self.bonds))
+        self.assertAlmostEqual(ladder['Total'].sum(), expected, places=8)
+        self.assertAlmostEqual(ladder['Redemption'].sum(), 2 * 100 + 1000 + 3 * 105, places=8)
+        march = ladder[ladder['Bucket'] == pd.Timestamp(2024, 3, 1)].iloc[0]
+        self.assertAlmostEqual(march['Redemption'], 1000.0)
+
+    def test_streaming_matches_single_pass(self):
+        full = cash_flow_ladder(self.bonds, freq='Q')
+        streamed = cash_flow_ladder(iter(self.bonds[::-1]), freq='Q', chunk_size=1)
+        pd.testing.assert_frame_equal(full, streamed)
+
+    def test_yearly_buckets(self):
+        ladder = CashFlowLadder('Y')
+        ladder.add(self.bonds[:1])
+        frame = ladder.to_frame()
+        self.assertEqual(list(frame['Bucket'].dt.year), [2023, 2024, 2025])
+        self.assertEqual(list(frame['Total']), [2.5, 5.0, 102.5])
+
+class TestBootstrapPanel(unittest.TestCase):
+    def setUp(self):
+        self.maturities = [3.0, 0.5, 1.0, 1.5, 2.0, 5.0]
+        self.coupons = np.array([0.04, 0.0, 0.0, 0.02, 0.03, 0.05])
+        rng = np.random.default_rng(1)
+        self.prices = np.array([101.0, 99.0, 97.5, 99.0, 99.5, 102.0]) + rng.normal(0, 0.5, (6, 6))
+        # An arbitrage-violating quote produces NaN downstream, as in the single-date bootstrap
+        self.prices[2, 4] = 1.0
+        self.dates = pd.date_range('2024-01-01', periods=6, freq='B')
+
+    def test_matches_single_date_bootstrap(self):
+        panel = bootstrap_yield_curves(self.maturities, pd.DataFrame(self.prices, index=self.dates), self.coupons)
+        self.assertEqual(list(panel.columns), sorted(self.maturities))
+        self.assertTrue(panel.index.equals(self.dates))
+        for d, row in enumerate(self.prices):
+            expected = bootstrap_yield_curve(self.maturities, row, self.coupons)['ZeroRate'].values
+            np.testing.assert_allclose(panel.iloc[d].values, expected, rtol=1e-12)
+        self.assertTrue(np.isnan(panel.iloc[2][2.0]))
+
+    def test_per_date_coupons_and_workers(self):
+        coupons = np.tile(self.coupons, (6, 1)) + np.linspace(0, 0.005, 6)[:, None]
+        serial = bootstrap_yield_curves(self.maturities, self.prices, coupons)
+        parallel = bootstrap_yield_curves(self.maturities, self.prices, coupons, workers=2)
+        np.testing.assert_array_equal(serial.to_numpy(), parallel.to_numpy())
+        expected = bootstrap_yield_curve(self.maturities, self.prices[5], coupons[5])['ZeroRate'].values
+        np.testing.assert_allclose(serial.iloc[5].values, expected, rtol=1e-12)
+
+class TestHorizonAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.curve = bootstrap_yield_curve([0.5, 1.0, 1.5, 2.0, 3.0, 5.0],
+                                           [99.0, 97.5, 99.0, 99.5, 101.0, 102.0],
+                                           [0.0, 0.0, 0.02, 0.03, 0.04, 0.05])
+        self.bonds = [
+            Bond(date(2024, 1, 1), date(2029, 1, 1), 0.05, 100, 100, 2),
+            Bond(date(2024, 2, 15), date(2026, 3, 1), 0.03, 1000, 1000, 4),
+        ]
+
+    def curve_price(self, bond):
+        z = np.interp(bond.time_periods, self.curve['Maturity'], self.curve['ZeroRate'])
+        return np.sum(bond.cash_flows / (1 + z / 2) ** (bond.time_periods * 2))
+
+    def test_matches_rebuilt_bonds(self):
+        result = horizon_analytics(self.bonds, self.curve, horizons=(1, 3, 12))
+        self.assertEqual(len(result), 6)
+        for _, row in result.iterrows():
+            bond = self.bonds[row['Bond']]
+            rolled = Bond(row['HorizonDate'], bond.maturity_date, bond.coupon_rate,
+                          bond.face_value, bond.redemption, bond.frequency)
+            received = bond.cash_flows[: bond.num_cash_flows - rolled.num_cash_flows].sum()
+            self.assertAlmostEqual(row['Price'], self.curve_price(bond), places=10)
+            self.assertAlmostEqual(row['HorizonPrice'], self.curve_price(rolled), places=10)
+            self.assertAlmostEqual(row['Coupons'], received, places=10)
+            self.assertAlmostEqual(row['TotalReturn'],
+                                   (row['HorizonPrice'] + row['Coupons']) / row['Price'] - 1, places=12)
+
+    def test_bond_maturing_inside_horizon(self):
+        bond = Bond(date(2024, 1, 1), date(2024, 3, 1), 0.06, 100, 100, 12)
+        result = horizon_analytics([bond], self.curve, horizons=(1, 3, 12))
+        price = self.curve_price(bond)
+        for _, row in result[result['Horizon'] != '1M'].iterrows():
+            self.assertAlmostEqual(row['Coupons'], 1.0, places=10)
+            self.assertAlmostEqual(row['HorizonPrice'], 100.0, places=10)
+            self.assertAlmostEqual(row['Carry'], 1.0 / price, places=12)
+            self.assertAlmostEqual(row['RollDown'], (100.0 - price) / price, places=12)
+            self.assertAlmostEqual(row['TotalReturn'], 101.0 / price - 1, places=12)
+        one_month = result[result['Horizon'] == '1M'].iloc[0]
+        self.assertAlmostEqual(one_month['Coupons'], 0.5, places=10)
+
+    def test_horizon_labels(self):
+        result = horizon_analytics(self.bonds, self.curve, horizons=(1, 3))
+        self.assertEqual(list(result['Horizon']), ['1M', '1M', '3M', '3M'])
+        self.assertEqual(result.loc[1, 'HorizonDate'], pd.Timestamp(2024, 3, 15))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,143 @@
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from core import Bond
+import time
+from service import PricingEngine, ServiceMetrics, MicroBatcher, make_server
+
+class TestPricingEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = PricingEngine()
+        self.terms = {'settlement_date': '2023-01-01', 'maturity_date': '2028-01-01',
+                      'coupon_rate': 0.05, 'face_value': 100, 'redemption': 100, 'frequency': 2}
+        self.bond = Bond(date(2023, 1, 1), date(2028, 1, 1), 0.05, 100, 100, 2)
+
+    def test_value_many_matches_bond(self):
+        results = self.engine.value_many([
+            dict(self.terms, ytm=0.06),
+            dict(self.terms, price=95.0),
+            dict(self.terms),
+            {'settlement_date': '2028-01-01', 'maturity_date': '2023-01-01', 'coupon_rate': 0.05, 'ytm': 0.05},
+        ])
+        self.assertAlmostEqual(results[0]['price'], self.bond.price(0.06), places=10)
+        self.assertAlmostEqual(results[0]['convexity'], self.bond.convexity(0.06), places=8)
+        self.assertAlmostEqual(results[1]['ytm'], self.bond.yield_to_maturity(95.0), places=8)
+        self.assertIn('error', results[2])
+        self.assertIn('error', results[3])
+        self.assertEqual(self.engine.stats()['schedules'], 1)
+
+    def test_invalid_frequency_is_rejected(self):
+        results = self.engine.value_many([
+            dict(self.terms, frequency=24, ytm=0.05),
+            dict(self.terms, frequency=0, ytm=0.05),
+            dict(self.terms, frequency=5, ytm=0.05),
+            dict(self.terms, frequency='monthly', ytm=0.05),
+            dict(self.terms, frequency=12.0, ytm=0.05),
+        ])
+        for result in results[:4]:
+            self.assertIn('frequency', result['error'])
+        self.assertIn('price', results[4])
+
+    def test_non_finite_results_are_errors(self):
+        results = self.engine.value_many([dict(self.terms, ytm=-3.0), dict(self.terms, ytm=0.05)])
+        self.assertIn('non-finite', results[0]['error'])
+        self.assertIn('price', results[1])
+
+    def test_curve_pricing(self):
+        self.engine.set_curve('govt', [1.0, 2.0, 5.0], [97.0, 99.0, 102.0], [0.0, 0.03, 0.05], frequency=2)
+        result = self.engine.value_many([dict(self.terms, curve='govt'), dict(self.terms, curve='missing')])
+        self.assertAlmostEqual(self.bond.price(result[0]['ytm']), result[0]['price'], places=8)
+        self.assertIn('error', result[1])
+
+    def test_bad_curve_does_not_fail_batch(self):
+        with self.assertRaises(ValueError):
+            self.engine.set_curve('nan', [1.0, 2.0], [float('nan'), 99.0], [0.0, 0.03])
+        self.assertEqual(self.engine.stats()['curves'], [])
+        # A stored curve that cannot be interpolated only fails its own requests
+        self.engine._curves['broken'] = ((np.empty(0), np.empty(0)), 2)
+        results = self.engine.value_many([dict(self.terms, ytm=0.05), dict(self.terms, curve='broken'),
+                                          dict(self.terms, price=95.0)])
+        self.assertAlmostEqual(results[0]['price'], self.bond.price(0.05), places=10)
+        self.assertIn('broken', results[1]['error'])
+        self.assertIn('ytm', results[2])
+
+class TestServiceLifecycle(unittest.TestCase):
+    def test_batcher_close_stops_worker(self):
+        batcher = MicroBatcher(PricingEngine(), ServiceMetrics())
+        future = batcher.submit({'settlement_date': '2023-01-01', 'maturity_date': '2028-01-01',
+                                 'coupon_rate': 0.05, 'ytm': 0.05})
+        batcher.close()
+        self.assertIn('price', future.result(timeout=1))
+        self.assertFalse(batcher._thread.is_alive())
+
+    def test_server_close_stops_batcher(self):
+        server = make_server('127.0.0.1', 0)
+        server.server_close()
+        self.assertFalse(server.batcher._thread.is_alive())
+
+    def test_throughput_is_measured_over_recent_window(self):
+        metrics = ServiceMetrics(rate_window=0.2)
+        for _ in range(10):
+            metrics.record_request(0.001)
+        self.assertGreater(metrics.snapshot()['throughput_rps'], 0)
+        time.sleep(0.3)
+        snap = metrics.snapshot()
+        self.assertEqual(snap['throughput_rps'], 0)
+        self.assertEqual(snap['requests'], 10)
+
+class TestPricingServer(unittest.TestCase):
+    def setUp(self):
+        self.server = make_server('127.0.0.1', 0, max_wait=0.005)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def post(self, path, payload):
+        request = urllib.request.Request(self.url + path, data=json.dumps(payload).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_bad_request_does_not_block_service(self):
+        terms = {'settlement_date': '2023-01-01', 'maturity_date': '2028-01-01', 'coupon_rate': 0.05, 'ytm': 0.05}
+        self.assertIn('error', self.post('/price', dict(terms, frequency=24)))
+        self.assertIn('price', self.post('/price', terms))
+
+    def test_curve_without_valid_rates_is_rejected(self):
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.post('/curves/bad', {'maturities': [1.0, 2.0], 'prices': [float('nan'), 99.0],
+                                      'coupon_rates': [0.0, 0.03]})
+        self.assertEqual(ctx.exception.code, 400)
+
+    def test_responses_are_strict_json(self):
+        terms = {'settlement_date': '2023-01-01', 'maturity_date': '2028-01-01', 'coupon_rate': 0.05}
+        request = urllib.request.Request(self.url + '/price', data=json.dumps(dict(terms, ytm=-3.0)).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            body = response.read().decode('utf-8')
+        self.assertNotIn('NaN', body)
+        json.loads(body, parse_constant=lambda c: self.fail(f"non-standard JSON constant {c}"))
+
+    def test_concurrent_requests_are_batched(self):
+        terms = {'settlement_date': '2023-01-01', 'maturity_date': '2028-01-01', 'coupon_rate': 0.05}
+        payloads = [dict(terms, ytm=0.04 + i / 1000) for i in range(40)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda p: self.post('/price', p), payloads))
+        self.assertTrue(all('price' in r for r in results))
+        batch = self.post('/price', payloads[:5])
+        self.assertEqual([r['price'] for r in batch], [r['price'] for r in results[:5]])
+        with urllib.request.urlopen(self.url + '/metrics') as response:
+            metrics = json.loads(response.read())
+        self.assertEqual(metrics['requests'], 45)
+        self.assertLess(metrics['batches'], 45)
+
+if __name__ == '__main__':
+    unittest.main()